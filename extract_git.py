@@ -8,94 +8,39 @@ This performs the following operations:
 4. Remove all git IPC handlers
 5. Update cleanup code to call cleanupGitWatchers
 """
+import re
+
+from git_extract_core import (
+    BRACE_BLOCK, CLEANUP_CALL, CLEAN_COMMENT, GEN_FILE_ID, GIT_CLEAR, GIT_DEB, GIT_HANDLERS,
+    IFACE, IMPORT_LINE, REGISTERED, REGISTER_CALL, SSH_STATUS, Anchor, Replacement, rewrite,
+)
+
+# git:get-info, also when the channel name is on the line after ipcMain.handle(
+GIT_GET_INFO_ANY = re.compile(rb"ipcMain\.handle\(\s*'git:get-info'")
+
+PLAN = (
+    # Step 1: Add import after line 17 (after generateFileId import)
+    (Anchor(GEN_FILE_ID, 17, 17), Replacement(IMPORT_LINE, keep=True)),
+    # Step 2: Skip GitWatcherSet interface and gitWatchers Map, through const GIT_DEBOUNCE_MS
+    (Anchor(IFACE), Replacement(until=GIT_DEB)),
+    # Step 3: Skip all git IPC handlers, from git:get-info through the closing of git:pull
+    (Anchor(GIT_GET_INFO_ANY), Replacement(until=GIT_HANDLERS)),
+    # Step 4: Add registerGitHandlers call after sshManager.on('status-change') block
+    (Anchor(SSH_STATUS), Replacement(REGISTER_CALL, until=BRACE_BLOCK, within=20, keep=True)),
+    # Step 5: Replace the git watcher cleanup block with cleanupGitWatchers() call
+    (Anchor(CLEAN_COMMENT), Replacement(CLEANUP_CALL, until=GIT_CLEAR)),
+)
 
-def main():
-    # Read the file
-    with open('electron/main.ts', 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    new_lines = []
-    skip_until = None
-    i = 0
-
-    while i < len(lines):
-        line = lines[i]
-
-        # Step 1: Add import after line 16 (after generateFileId import)
-        if i == 16 and 'generateFileId' in line:
-            new_lines.append(line)
-            new_lines.append("import { registerGitHandlers, cleanupGitWatchers } from './services/git-service.js'\n")
-            i += 1
-            continue
-
-        # Step 2: Skip GitWatcherSet interface and gitWatchers Map (lines 377-386, but adjusted for new import)
-        # Look for "interface GitWatcherSet"
-        if 'interface GitWatcherSet' in line:
-            # Skip until we find the line with "const GIT_DEBOUNCE_MS" and one more line
-            while i < len(lines):
-                i += 1
-                if 'const GIT_DEBOUNCE_MS' in lines[i]:
-                    i += 1  # Skip the GIT_DEBOUNCE_MS line too
-                    break
-            continue
-
-        # Step 3: Skip all git IPC handlers
-        # Look for ipcMain.handle('git:get-info'
-        if "ipcMain.handle('git:get-info'" in line:
-            # Skip until we find the closing of git:pull handler
-            # Find the end of git:pull handler
-            while i < len(lines):
-                i += 1
-                if i >= len(lines):
-                    break
-                # Look for the pattern: git:pull handler followed by its closing
-                if "ipcMain.handle(" in lines[i] and "'git:pull'" not in lines[i]:
-                    # We've reached the next handler (not git-related)
-                    # Go back to include this line
-                    break
-                if "// File system IPC handlers" in lines[i]:
-                    # We've reached the file system handlers section
-                    break
-            continue
-
-        # Step 4: Add registerGitHandlers call after sshManager.on('status-change') block
-        # Look for the closing of sshManager.on block
-        if i > 0 and '  })' in line and 'sshManager.on' in ''.join(lines[max(0, i-20):i]):
-            # Check if this is the status-change listener closing
-            for j in range(max(0, i-20), i):
-                if "sshManager.on('status-change'" in lines[j]:
-                    new_lines.append(line)
-                    new_lines.append('\n')
-                    new_lines.append('  // Register all git-related IPC handlers\n')
-                    new_lines.append('  registerGitHandlers(mainWindow, sshManager, execInContextAsync)\n')
-                    i += 1
-                    continue
-
-        # Step 5: Update cleanup code
-        if '// Clean up all git watchers' in line:
-            # Replace the git watcher cleanup block with cleanupGitWatchers() call
-            new_lines.append('    // Clean up all git watchers\n')
-            new_lines.append('    cleanupGitWatchers()\n')
-            # Skip until gitWatchers.clear()
-            while i < len(lines):
-                i += 1
-                if 'gitWatchers.clear()' in lines[i]:
-                    i += 1
-                    break
-            continue
-
-        # Default: keep the line
-        new_lines.append(line)
-        i += 1
-
-    # Write the modified file
-    with open('electron/main.ts', 'w', encoding='utf-8') as f:
-        f.writelines(new_lines)
 
+def main():
+    edit_plan = rewrite('electron/main.ts', PLAN, unless=REGISTERED)
+    if edit_plan is None:
+        return
+    old, new = edit_plan.line_count, edit_plan.new_count
     print("Git handlers extraction complete!")
-    print(f"Original lines: {len(lines)}")
-    print(f"New lines: {len(new_lines)}")
-    print(f"Lines removed: {len(lines) - len(new_lines)}")
+    print(f"Original lines: {old}")
+    print(f"New lines: {new}")
+    print(f"Lines removed: {old - new}")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Shared rewriter for extract_git.py and the modify_main*.py scripts
+
+Each script describes its edits to electron/main.ts as a plan: a tuple of
+(Anchor, Replacement) steps. Anchors pinned to a single line are probed on
+that line only; the rest are compiled into one regex and located in a
+single sweep of the file. The matching steps are resolved into byte-range
+edits and spliced into the output.
+"""
+import hashlib
+import mmap
+import os
+import re
+import shutil
+import sys
+from bisect import bisect_left, bisect_right
+from collections import deque, namedtuple
+from contextlib import nullcontext
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+
+try:
+    import ahocorasick
+except ImportError:  # optional; the regex sweep finds the same anchors
+    ahocorasick = None
+
+# Anchor literals shared by every plan
+GEN_FILE_ID = b'generateFileId'
+IFACE = b'interface GitWatcherSet'
+GIT_DEB = b'const GIT_DEBOUNCE_MS'
+SSH_STATUS = b"sshManager.on('status-change'"
+GIT_GET_INFO = b"ipcMain.handle('git:get-info'"
+CLEAN_COMMENT = b'// Clean up all git watchers'
+GIT_CLEAR = b'gitWatchers.clear()'
+
+# Every ipcMain.handle() registration, also when the channel is on the next
+# line
+HANDLER = re.compile(rb"ipcMain\.handle\(\s*'([^']+)'")
+# Brackets, and the strings and comments whose brackets don't count
+BRACKET_TOKEN = re.compile(
+    rb"""'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*"|`(?:\\.|[^`\\])*`"""
+    rb'|//[^\n]*|/\*.*?\*/|[(){}]',
+    re.DOTALL,
+)
+CLOSING = {b'(': b')', b'{': b'}'}
+# Line ends, for indexing line starts in one pass over the mapping
+NEWLINE = re.compile(rb'\n')
+
+# The Aho-Corasick sweep decodes the mapping this many bytes at a time
+SWEEP_CHUNK = 1024 * 1024
+# Rewritten output is streamed to a temp file through a buffer this size
+OUTPUT_BUFFER_SIZE = 128 * 1024
+# Unchanged ranges are copied file-to-file in the kernel where sendfile
+# supports a regular file as destination (Linux); elsewhere they are
+# written from the mapping like any other chunk
+USE_SENDFILE = hasattr(os, 'sendfile') and sys.platform.startswith('linux')
+
+IMPORT_LINE = b"import { registerGitHandlers, cleanupGitWatchers } from './services/git-service.js'\n"
+REGISTER_CALL = (
+    b'\n'
+    b'  // Register all git-related IPC handlers\n'
+    b'  registerGitHandlers(mainWindow, sshManager, execInContextAsync)\n'
+)
+CLEANUP_CALL = (
+    b'    // Clean up all git watchers\n'
+    b'    cleanupGitWatchers()\n'
+)
+# Present once a plan has inserted REGISTER_CALL; a second call would register
+# every git IPC channel twice
+REGISTERED = b'registerGitHandlers('
+
+# pattern: bytes literal (or compiled pattern) marking the first line of the step
+# first/last: optional 1-based line range the anchor must fall in; with
+# first == last the anchor is only looked for on that one line
+Anchor = namedtuple('Anchor', ['pattern', 'first', 'last'], defaults=[None, None])
+
+# The step covers `count` lines from the anchor, or runs through the line
+# where `until` (a bytes literal, or a compiled pattern) is next found after
+# the anchor line. `until` may also be BRACE_BLOCK or a HandlerRun, see
+# below. With `within` set, a literal, pattern or BRACE_BLOCK end is only
+# looked for that many lines past the anchor line.
+# Covered lines are dropped unless `keep` is set; `text` is emitted after
+# them either way. `note` goes into EditPlan.notes with {start}/{end} (1-based) filled in.
+Replacement = namedtuple(
+    'Replacement',
+    ['text', 'count', 'until', 'within', 'keep', 'note'],
+    defaults=[b'', 1, None, None, False, None],
+)
+
+# `until` marker: the step runs through the line closing the first brace
+# block opened from the anchor line on
+BraceBlock = namedtuple('BraceBlock', [])
+BRACE_BLOCK = BraceBlock()
+
+# `until` marker: the step runs through the closing line of the last handler
+# in the run of consecutive ipcMain.handle() channels starting with prefix,
+# beginning with the handler on the anchor line
+HandlerRun = namedtuple('HandlerRun', ['prefix'])
+GIT_HANDLERS = HandlerRun(b'git:')
+
+
+def is_pinned(anchor):
+    return anchor.first is not None and anchor.first == anchor.last
+
+
+@lru_cache(maxsize=None)
+def compile_plan(plan):
+    """
+    One alternation over every anchor in the plan that is not pinned to a
+    line; group sN is step N. None if every anchor is pinned.
+    """
+    alternatives = [
+        b'(?P<s%d>%s)' % (n, pattern_source(anchor.pattern))
+        for n, (anchor, _) in enumerate(plan)
+        if not is_pinned(anchor)
+    ]
+    return re.compile(b'|'.join(alternatives), re.MULTILINE) if alternatives else None
+
+
+@lru_cache(maxsize=None)
+def build_automaton(plan):
+    """
+    Aho-Corasick automaton over the plan's swept anchors, or None when
+    pyahocorasick is not installed or an anchor is a regex rather than a literal
+    """
+    swept = [(n, anchor.pattern) for n, (anchor, _) in enumerate(plan) if not is_pinned(anchor)]
+    if ahocorasick is None or not swept or not all(isinstance(p, bytes) for _, p in swept):
+        return None
+    automaton = ahocorasick.Automaton()
+    for n, pattern in swept:
+        # Anchors are ASCII and the file is decoded as latin-1, so string
+        # offsets are byte offsets; a repeated literal keeps its first step
+        word = pattern.decode('latin-1')
+        if word not in automaton:
+            automaton.add_word(word, (n, len(word)))
+    automaton.make_automaton()
+    return automaton
+
+
+def sweep(plan, data):
+    """(offset, step) of every swept anchor occurrence, in file order"""
+    automaton = build_automaton(plan)
+    if automaton is not None:
+        # The automaton only takes str, so decode a chunk at a time rather
+        # than the whole mapping. Each chunk starts a longest-anchor-minus-one
+        # overlap early; hits ending in that overlap were seen last chunk
+        overlap = max(len(anchor.pattern) for anchor, _ in plan if not is_pinned(anchor)) - 1
+        hits = []
+        for pos in range(0, len(data), SWEEP_CHUNK):
+            base = max(pos - overlap, 0)
+            text = str(data[base:pos + SWEEP_CHUNK], 'latin-1')
+            hits.extend(
+                (base + end - size + 1, n)
+                for end, (n, size) in automaton.iter(text)
+                if base + end >= pos
+            )
+        hits.sort()
+        return hits
+    pattern = compile_plan(plan)
+    if pattern is None:
+        return []
+    return [(m.start(), int(m.lastgroup[1:])) for m in pattern.finditer(data)]
+
+
+def pattern_source(pattern):
+    return re.escape(pattern) if isinstance(pattern, bytes) else pattern.pattern
+
+
+def find_line_starts(data):
+    """Byte offset of every line start, with len(data) as the last entry"""
+    line_starts = [0]
+    line_starts.extend(m.end() for m in NEWLINE.finditer(data))
+    if line_starts[-1] != len(data):
+        line_starts.append(len(data))
+    return line_starts
+
+
+def find_anchors(plan, data, line_starts):
+    """Map 0-based line index -> plan step (first anchor on a line wins)"""
+    # Deliberately a single sequential sweep: all anchors come out of one
+    # automaton or regex pass, neither of which releases the GIL, so
+    # splitting the scan over threads or worker processes only adds overhead
+    anchors = {}
+    for offset, step in sweep(plan, data):
+        i = bisect_right(line_starts, offset) - 1
+        anchor = plan[step][0]
+        if anchor.first is not None and i + 1 < anchor.first:
+            continue
+        if anchor.last is not None and i + 1 > anchor.last:
+            continue
+        anchors.setdefault(i, step)
+
+    # Pinned anchors (e.g. the generateFileId import on line 16) only need
+    # their one line checked, not every use of the name across the file
+    for step, (anchor, _) in enumerate(plan):
+        if not is_pinned(anchor) or anchor.first > len(line_starts) - 1:
+            continue
+        i = anchor.first - 1
+        if on_line(data, line_starts, i, anchor.pattern):
+            anchors.setdefault(i, step)
+    return anchors
+
+
+def on_line(data, line_starts, i, pattern):
+    start, end = line_starts[i], line_starts[i + 1]
+    if isinstance(pattern, bytes):
+        return data.find(pattern, start, end) >= 0
+    return pattern.search(data, start, end) is not None
+
+
+def index_handlers(data):
+    """Channel names and offsets of every ipcMain.handle() registration, in file order"""
+    names = []
+    offsets = []
+    for m in HANDLER.finditer(data):
+        names.append(m.group(1))
+        offsets.append(m.start())
+    return names, offsets
+
+
+def closing_bracket(data, start, stop, opener):
+    """
+    Offset of the bracket that closes the first opener at or after start,
+    ignoring brackets in strings and comments; None if not closed before stop
+    """
+    closer = CLOSING[opener]
+    depth = 0
+    for m in BRACKET_TOKEN.finditer(data, start, stop):
+        token = m.group()
+        if token == opener:
+            depth += 1
+        elif token == closer and depth:
+            depth -= 1
+            if not depth:
+                return m.start()
+    return None
+
+
+def handler_run_end(data, line_starts, i, prefix, handlers):
+    """Index just past the closing line of the handler run starting on line i, or None"""
+    names, offsets = handlers
+    first = bisect_left(offsets, line_starts[i])
+    if first == len(offsets) or offsets[first] >= line_starts[i + 1]:
+        return None
+    run = enumerate(islice(names, first, None), first)
+    nxt = next((k for k, name in run if not name.startswith(prefix)), len(names))
+    if nxt == first:
+        # The handler on line i is not part of the run
+        return None
+    stop = offsets[nxt] if nxt < len(offsets) else len(data)
+    # The run ends where the last handler's ipcMain.handle( call closes
+    pos = closing_bracket(data, offsets[nxt - 1], stop, b'(')
+    if pos is None:
+        return None
+    return bisect_right(line_starts, pos)
+
+
+def brace_block_end(data, line_starts, i, stop):
+    """Index just past the line closing the first brace block from line i, or None"""
+    pos = closing_bracket(data, line_starts[i], stop, b'{')
+    if pos is None:
+        return None
+    return bisect_right(line_starts, pos)
+
+
+def block_end(data, line_starts, i, until, within, handlers):
+    """Index just past the line where until is found after line i, or None"""
+    stop = line_starts[min(i + 1 + within, len(line_starts) - 1)] if within else len(data)
+    if isinstance(until, BraceBlock):
+        return brace_block_end(data, line_starts, i, stop)
+    if isinstance(until, HandlerRun):
+        return handler_run_end(data, line_starts, i, until.prefix, handlers)
+    start = line_starts[i + 1]
+    if isinstance(until, bytes):
+        pos = data.find(until, start, stop)
+        if pos < 0:
+            return None
+        last = pos + len(until) - 1
+    else:
+        m = until.search(data, start, stop)
+        if m is None:
+            return None
+        last = m.end() - 1
+    return bisect_right(line_starts, last)
+
+
+def consume(iterator, n):
+    """Advance iterator n steps at C speed (itertools recipe)"""
+    deque(islice(iterator, n), maxlen=0)
+
+
+def new_hasher():
+    return hashlib.blake2b(digest_size=16)
+
+
+def fingerprint(data):
+    hasher = new_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def plan_fingerprint(plan):
+    """Hash of the plan itself, so one script's record never vouches for another's"""
+    return fingerprint(repr(plan).encode())
+
+
+def sidecar_path(path):
+    """
+    Where the plan and post-edit hash of path are recorded, as
+    <plan>:<hash>:done, e.g. in electron/.main.ts.editplan.hash
+    """
+    return path.with_name(f'.{path.name}.editplan.hash')
+
+
+class PlanError(Exception):
+    """A step's anchor was found but its block could not be resolved"""
+
+
+# A plan resolved against one file: sorted, non-overlapping (start, end, text)
+# byte-range replacements, the line counts before and after, and the notes
+# of the steps that fired
+EditPlan = namedtuple('EditPlan', ['edits', 'line_count', 'new_count', 'notes'])
+
+# EditPlans by (plan, input fingerprint), so a plan meeting content it has
+# already resolved goes straight to the splice with the offsets baked in
+_specialized = {}
+
+
+def plan_edits(plan, data):
+    """Resolve plan against data into an EditPlan"""
+    line_starts = find_line_starts(data)
+    line_count = len(line_starts) - 1
+    anchors = find_anchors(plan, data, line_starts)
+    handlers = None
+    if any(isinstance(repl.until, HandlerRun) for _, repl in plan):
+        handlers = index_handlers(data)
+    # Inserted text is written with \n; match the file's line endings instead
+    crlf = data.find(b'\r\n') >= 0
+
+    edits = []
+    notes = []
+    new_count = line_count
+
+    # Handle each step as its anchor line comes up; anchors inside a handled
+    # block are skipped
+    order = sorted(anchors)
+    it = enumerate(order)
+    for k, a in it:
+        repl = plan[anchors[a]][1]
+        end = min(a + repl.count, line_count)
+        if repl.until is not None:
+            end = block_end(data, line_starts, a, repl.until, repl.within, handlers)
+            if end is None:
+                # Applying the other steps alone would leave a half-extracted file
+                raise PlanError(f"line {a + 1}: anchor found but not the end of its block")
+
+        start = end if repl.keep else a
+        text = repl.text.replace(b'\n', b'\r\n') if crlf else repl.text
+        edits.append((line_starts[start], line_starts[end], text))
+        new_count += repl.text.count(b'\n') - (end - start)
+        if repl.note:
+            notes.append(repl.note.format(start=a + 1, end=end))
+        consume(it, bisect_left(order, end, k + 1) - k - 1)
+    return EditPlan(tuple(edits), line_count, new_count, tuple(notes))
+
+
+def specialize(plan, data, digest):
+    """plan_edits() for data whose fingerprint is digest, memoised per content"""
+    key = (plan, digest)
+    if key not in _specialized:
+        _specialized[key] = plan_edits(plan, data)
+    return _specialized[key]
+
+
+def splice(size, edits, copy, write):
+    """
+    Emit a size-byte source with edits applied: kept ranges go to copy as
+    (start, end) byte offsets, replacement texts to write, in order
+    """
+    cur = 0
+    for start, end, text in edits:
+        copy(cur, start)
+        write(text)
+        cur = end
+    copy(cur, size)
+
+
+def send_range(src_fd, dst_fd, offset, count):
+    """Copy count bytes at offset in src_fd to the current position of dst_fd"""
+    while count > 0:
+        sent = os.sendfile(dst_fd, src_fd, offset, count)
+        if sent == 0:
+            raise OSError(f"sendfile stopped with {count} bytes left to copy")
+        offset += sent
+        count -= sent
+
+
+def rewrite(path, plan, unless=None):
+    """
+    Apply plan to the file at path; returns the EditPlan applied, for the
+    caller to report its line counts and notes once the file is in place, or
+    None if the file is unchanged since this plan last rewrote it, or
+    already contains the bytes literal unless. Raises PlanError, leaving
+    the file alone, if a step cannot be resolved.
+    """
+    path = Path(path)
+    sidecar = sidecar_path(path)
+    done = sidecar.read_text(errors='ignore').strip() if sidecar.exists() else None
+    plan_digest = plan_fingerprint(plan)
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            mapping = nullcontext(b'')  # mmap refuses empty files
+        # Scan straight out of the page cache and stream the output to a temp
+        # file, so neither the input nor the output is held in memory
+        with mapping as data, memoryview(data) as view:
+            digest = fingerprint(data)
+            if done == f'{plan_digest}:{digest}:done':
+                print(f"{path} already extracted, nothing to do")
+                return None
+            if unless is not None and data.find(unless) >= 0:
+                print(f"{path} already contains '{unless.decode()}', nothing to do")
+                return None
+
+            # Resolve every step before anything is written
+            edit_plan = specialize(plan, data, digest)
+            tmp = path.with_name(path.name + '.tmp')
+            hasher = new_hasher()
+            try:
+                with open(tmp, 'wb', buffering=OUTPUT_BUFFER_SIZE) as out:
+                    def write(chunk):
+                        out.write(chunk)
+                        hasher.update(chunk)
+
+                    def copy(start, end):
+                        if start == end:
+                            return
+                        if not USE_SENDFILE:
+                            write(view[start:end])
+                            return
+                        hasher.update(view[start:end])
+                        out.flush()  # sendfile writes at the raw file position
+                        send_range(f.fileno(), out.fileno(), start, end - start)
+
+                    splice(len(data), edit_plan.edits, copy, write)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+
+    shutil.copymode(path, tmp)
+    os.replace(tmp, path)
+    # Only a run that changed something vouches for the result; a plan that
+    # matched nothing (wrong file version) must not block the right script
+    if edit_plan.edits:
+        sidecar.write_text(f'{plan_digest}:{hasher.hexdigest()}:done\n')
+    return edit_plan
@@ -3,79 +3,43 @@
 Modify electron/main.ts to use git-service
 Works with the original git-restored file (2967 lines)
 """
+from git_extract_core import (
+    BRACE_BLOCK, CLEANUP_CALL, CLEAN_COMMENT, GEN_FILE_ID, GIT_CLEAR, GIT_GET_INFO,
+    GIT_HANDLERS, IFACE, IMPORT_LINE, REGISTERED, REGISTER_CALL, SSH_STATUS, Anchor,
+    Replacement, rewrite,
+)
+
+PLAN = (
+    # Step 1: Add import after line 16 (generateFileId import)
+    (Anchor(GEN_FILE_ID, 16, 16), Replacement(IMPORT_LINE, keep=True)),
+    # Step 2: Skip GitWatcherSet interface and gitWatchers (lines 434-443)
+    (Anchor(IFACE, 434, 434),
+     Replacement(count=10, note='Skipping GitWatcherSet at line {start}')),
+    # Step 3: Add registerGitHandlers call after the sshManager.on('status-change') block
+    # (closing around line 545, so the listener starts in the 10 lines before that)
+    (Anchor(SSH_STATUS, 531, 548),
+     Replacement(REGISTER_CALL, until=BRACE_BLOCK, within=10, keep=True,
+                 note='Adding registerGitHandlers call after line {end}')),
+    # Step 4: Skip git IPC handlers (lines 1277-2018, through the closing ) of git:pull)
+    (Anchor(GIT_GET_INFO, 1277, 1277),
+     Replacement(until=GIT_HANDLERS, note='Skipping git handlers from line {start}')),
+    # Step 5: Replace git watcher cleanup, through gitWatchers.clear()
+    (Anchor(CLEAN_COMMENT, 501, 599),
+     Replacement(CLEANUP_CALL, until=GIT_CLEAR,
+                 note='Replacing git watcher cleanup at line {start}')),
+)
 
-def main():
-    with open('electron/main.ts', 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    print(f"Starting with {len(lines)} lines")
-
-    new_lines = []
-    i = 0
-
-    while i < len(lines):
-        line = lines[i]
-        line_num = i + 1  # 1-indexed
-
-        # Step 1: Add import after line 16 (generateFileId import)
-        if line_num == 16 and 'generateFileId' in line:
-            new_lines.append(line)
-            new_lines.append("import { registerGitHandlers, cleanupGitWatchers } from './services/git-service.js'\n")
-            i += 1
-            continue
-
-        # Step 2: Skip GitWatcherSet interface and gitWatchers (lines 434-443)
-        if line_num == 434 and 'interface GitWatcherSet' in line:
-            print(f"Skipping GitWatcherSet at line {line_num}")
-            # Skip through line 443 (const GIT_DEBOUNCE_MS)
-            i += 10  # Skip 10 lines (434-443)
-            continue
 
-        # Step 3: Add registerGitHandlers call after sshManager.on block (around line 545)
-        # Find the line that closes the sshManager.on('status-change') block
-        if '  })' in line and line_num > 540 and line_num < 550:
-            # Check if previous lines contain sshManager.on('status-change'
-            context = ''.join(lines[max(0, i-10):i])
-            if "sshManager.on('status-change'" in context:
-                print(f"Adding registerGitHandlers call after line {line_num}")
-                new_lines.append(line)
-                new_lines.append('\n')
-                new_lines.append('  // Register all git-related IPC handlers\n')
-                new_lines.append('  registerGitHandlers(mainWindow, sshManager, execInContextAsync)\n')
-                i += 1
-                continue
-
-        # Step 4: Skip git IPC handlers (lines 1277-2018)
-        if line_num == 1277 and "ipcMain.handle('git:get-info'" in line:
-            print(f"Skipping git handlers from line {line_num}")
-            # Skip to line 2019 (after the closing ) of git:pull)
-            # 2019 - 1277 = 742 lines to skip
-            i += 742
-            continue
-
-        # Step 5: Replace git watcher cleanup
-        if '// Clean up all git watchers' in line and line_num > 500 and line_num < 600:
-            print(f"Replacing git watcher cleanup at line {line_num}")
-            new_lines.append('    // Clean up all git watchers\n')
-            new_lines.append('    cleanupGitWatchers()\n')
-            # Skip the cleanup loop - find gitWatchers.clear()
-            while i < len(lines):
-                i += 1
-                if 'gitWatchers.clear()' in lines[i]:
-                    i += 1  # Skip the clear() line too
-                    break
-            continue
-
-        # Default: keep line
-        new_lines.append(line)
-        i += 1
-
-    # Write back
-    with open('electron/main.ts', 'w', encoding='utf-8') as f:
-        f.writelines(new_lines)
-
-    print(f"\nModified! Original: {len(lines)} lines, New: {len(new_lines)} lines")
-    print(f"Removed: {len(lines) - len(new_lines)} lines")
+def main():
+    edit_plan = rewrite('electron/main.ts', PLAN, unless=REGISTERED)
+    if edit_plan is None:
+        return
+    old, new = edit_plan.line_count, edit_plan.new_count
+    print(f"Starting with {old} lines")
+    for note in edit_plan.notes:
+        print(note)
+    print(f"\nModified! Original: {old} lines, New: {new} lines")
+    print(f"Removed: {old - new} lines")
     print(f"Expected to remove ~750 lines (git handlers + GitWatcherSet + cleanup)")
 
 if __name__ == '__main__':
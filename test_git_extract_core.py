@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Regression tests for git_extract_core and the scripts built on it
+
+Each script runs against a generated main.ts laid out the way its PLAN
+expects. The expected output is what the original line-by-line scripts
+wrote for that layout: the import added, the GitWatcherSet block and the
+git handlers dropped, the status-change listener followed by the
+registerGitHandlers call and the watcher cleanup collapsed. The original
+extract_git.py never got that far, so its layout is held to the same result.
+
+Run with: python3 -m unittest test_git_extract_core
+"""
+import contextlib
+import importlib
+import io
+import os
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+import git_extract_core as core
+
+# Line numbers (1-based) of each block in the file a script targets
+LAYOUTS = {
+    'modify_main': dict(
+        total=2300, imp=16, iface=434, ssh_close=492, clean=507, clear=519,
+        git_start=978, git_end=1678,
+    ),
+    'modify_main_final': dict(
+        total=2967, imp=16, iface=434, ssh_close=545, clean=560, clear=572,
+        git_start=1277, git_end=2018,
+    ),
+    'modify_main_v2': dict(
+        total=2283, imp=16, iface=439, ssh_close=497, clean=540, clear=552,
+        git_start=947, git_end=1689,
+    ),
+    'extract_git': dict(
+        total=2967, imp=17, iface=435, ssh_close=546, clean=561, clear=573,
+        git_start=1278, git_end=2019,
+    ),
+}
+
+IFACE_BLOCK = [
+    'interface GitWatcherSet {\n',
+    '  watcher: fs.FSWatcher | null\n',
+    '  debounceTimer: NodeJS.Timeout | null\n',
+    '  lastHeadContent: string\n',
+    '  lastIndexMtime: number\n',
+    '  lastLogsHeadMtime: number\n',
+    '}\n',
+    '\n',
+    'const gitWatchers = new Map<string, GitWatcherSet>()\n',
+    'const GIT_DEBOUNCE_MS = 500\n',
+]
+STATUS_LISTENER = [
+    "  sshManager.on('status-change', (connectionId: string, connected: boolean) => {\n",
+    '    if (!mainWindow.isDestroyed()) {\n',
+    "      mainWindow.webContents.send('ssh:status-change', connectionId, connected)\n",
+    '    }\n',
+    '  })\n',
+    '\n',
+    '  // Forward SSH project master status changes to renderer\n',
+    "  sshManager.on('project-status-change', (projectId: string, connected: boolean) => {\n",
+    "    mainWindow.webContents.send('ssh:project-status-change', projectId, connected)\n",
+    '  })\n',
+]
+
+
+def git_handlers(start, end):
+    """ipcMain.handle() calls filling lines start..end, git:get-info first, git:pull last"""
+    lines = []
+    n = 0
+    while start + len(lines) <= end:
+        remaining = end - start - len(lines) + 1
+        size = remaining if remaining <= 24 else 12
+        name = 'git:pull' if size == remaining else 'git:get-info' if n == 0 else f'git:op{n}'
+        k = start + len(lines)
+        if n == 0:
+            lines.append(f"ipcMain.handle('{name}', async (_event, projectPath) => {{\n")
+            lines += [f'  await step{j}(`${{projectPath}}`)\n' for j in range(size - 2)]
+            lines.append('})\n')
+        else:
+            # Channel on the line after ipcMain.handle(, closed by a column-0 )
+            lines += [
+                'ipcMain.handle(\n', f"  '{name}',\n", '  async (_event, projectPath) => {\n',
+            ]
+            lines += [f"    await step{k + j}(')')\n" for j in range(size - 5)]
+            lines += ['  }\n', ')\n']
+        n += 1
+    return lines
+
+
+def build(total, imp, iface, ssh_close, clean, clear, git_start, git_end):
+    """(input, expected output) lines for one layout"""
+    lines = [f'const filler{k} = {k}\n' for k in range(1, total + 1)]
+
+    def put(first, block):
+        lines[first - 1:first - 1 + len(block)] = block
+
+    put(1, [f"import {{ dep{k} }} from './dep{k}.js'\n" for k in range(1, imp)])
+    put(imp, ["import { generateFileId } from './file-id-util.js'\n"])
+    put(iface, IFACE_BLOCK)
+    put(ssh_close - 4, STATUS_LISTENER)
+    cleanup = [
+        '    // Clean up all git watchers\n',
+        '    for (const watcherSet of gitWatchers.values()) {\n',
+    ]
+    cleanup += [f'      watcherSet.step{k}()\n' for k in range(clean + 2, clear - 1)]
+    cleanup += ['    }\n', '    gitWatchers.clear()\n']
+    put(clean, cleanup)
+    put(git_start, git_handlers(git_start, git_end))
+    put(git_end + 1, [
+        '\n', '// File system IPC handlers\n',
+        "ipcMain.handle('fs:read', async () => {\n", '  return null\n', '})\n',
+    ])
+
+    # Bottom up, so the line numbers above stay valid
+    expected = list(lines)
+    del expected[git_start - 1:git_end]
+    expected[clean - 1:clear] = core.CLEANUP_CALL.decode().splitlines(True)
+    expected[ssh_close:ssh_close] = core.REGISTER_CALL.decode().splitlines(True)
+    del expected[iface - 1:iface - 1 + len(IFACE_BLOCK)]
+    expected[imp:imp] = [core.IMPORT_LINE.decode()]
+    return lines, expected
+
+
+def lengthen_listener(lines, extra):
+    """Insert extra body lines into the status-change listener"""
+    i = next(k for k, line in enumerate(lines) if core.SSH_STATUS.decode() in line)
+    return lines[:i + 1] + [f'    log({k})\n' for k in range(extra)] + lines[i + 1:]
+
+
+def encode(lines, newline='\n'):
+    return ''.join(lines).replace('\n', newline).encode()
+
+
+class ScriptTestCase(unittest.TestCase):
+    """Runs scripts in a scratch directory holding electron/main.ts"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        (self.root / 'electron').mkdir()
+        self.main_ts = self.root / 'electron' / 'main.ts'
+        self.sidecar = core.sidecar_path(self.main_ts)
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        self.addCleanup(os.chdir, cwd)
+        # Every case resolves its plan afresh
+        core._specialized.clear()
+        self.addCleanup(core._specialized.clear)
+
+    def run_script(self, name):
+        """Run name.main(); returns what it printed"""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            importlib.import_module(name).main()
+        return out.getvalue()
+
+    def patch(self, name, value):
+        old = getattr(core, name)
+        setattr(core, name, value)
+        self.addCleanup(setattr, core, name, old)
+
+
+class ScriptOutputTest(ScriptTestCase):
+
+    def check(self, script, newline='\n'):
+        lines, expected = build(**LAYOUTS[script])
+        self.main_ts.write_bytes(encode(lines, newline))
+        self.run_script(script)
+        self.assertEqual(self.main_ts.read_bytes(), encode(expected, newline))
+        self.assertTrue(self.sidecar.exists())
+
+    def test_matches_original_scripts(self):
+        for script in LAYOUTS:
+            with self.subTest(script=script):
+                self.check(script)
+                self.sidecar.unlink()
+
+    def test_without_sendfile(self):
+        self.patch('USE_SENDFILE', False)
+        for script in LAYOUTS:
+            with self.subTest(script=script):
+                self.check(script)
+                self.sidecar.unlink()
+
+    def test_small_sweep_chunks(self):
+        self.patch('SWEEP_CHUNK', 7)
+        for script in LAYOUTS:
+            with self.subTest(script=script):
+                self.check(script)
+                self.sidecar.unlink()
+
+    def test_crlf_kept(self):
+        for script in LAYOUTS:
+            with self.subTest(script=script):
+                self.check(script, newline='\r\n')
+                self.sidecar.unlink()
+
+    def test_final_log(self):
+        lines, _ = build(**LAYOUTS['modify_main_final'])
+        self.main_ts.write_bytes(encode(lines))
+        self.assertEqual(self.run_script('modify_main_final'), (
+            'Starting with 2967 lines\n'
+            'Skipping GitWatcherSet at line 434\n'
+            'Adding registerGitHandlers call after line 545\n'
+            'Replacing git watcher cleanup at line 560\n'
+            'Skipping git handlers from line 1277\n'
+            '\n'
+            'Modified! Original: 2967 lines, New: 2208 lines\n'
+            'Removed: 759 lines\n'
+            'Expected to remove ~750 lines (git handlers + GitWatcherSet + cleanup)\n'
+        ))
+
+
+class IdempotenceTest(ScriptTestCase):
+
+    def test_second_run_is_skipped(self):
+        lines, expected = build(**LAYOUTS['modify_main'])
+        self.main_ts.write_bytes(encode(lines))
+        self.run_script('modify_main')
+        self.assertIn('already extracted', self.run_script('modify_main'))
+        self.assertEqual(self.main_ts.read_bytes(), encode(expected))
+
+    def test_already_extracted_input(self):
+        for script in LAYOUTS:
+            with self.subTest(script=script):
+                _, expected = build(**LAYOUTS[script])
+                self.main_ts.write_bytes(encode(expected))
+                self.assertIn('already contains', self.run_script(script))
+                self.assertEqual(self.main_ts.read_bytes(), encode(expected))
+                self.assertFalse(self.sidecar.exists())
+
+    def test_no_op_run_does_not_block_other_scripts(self):
+        self.main_ts.write_bytes(b'a\nb\n')
+        self.run_script('modify_main')
+        self.assertFalse(self.sidecar.exists())
+
+    def test_sidecar_is_per_plan(self):
+        lines, _ = build(**LAYOUTS['modify_main'])
+        self.main_ts.write_bytes(encode(lines))
+        self.run_script('modify_main')
+        self.assertNotIn('already extracted', self.run_script('modify_main_v2'))
+
+
+class BlockEndTest(ScriptTestCase):
+
+    def test_long_status_listener(self):
+        # Longer than the modify_main* window, inside extract_git's 20 lines
+        lines, expected = build(**LAYOUTS['extract_git'])
+        self.main_ts.write_bytes(encode(lengthen_listener(lines, 12)))
+        self.run_script('extract_git')
+        self.assertEqual(self.main_ts.read_bytes(), encode(lengthen_listener(expected, 12)))
+
+    def test_unresolved_block_end_leaves_file_alone(self):
+        lines, _ = build(**LAYOUTS['extract_git'])
+        original = encode(lengthen_listener(lines, 25))
+        self.main_ts.write_bytes(original)
+        with self.assertRaises(core.PlanError):
+            self.run_script('extract_git')
+        self.assertEqual(self.main_ts.read_bytes(), original)
+        self.assertFalse(self.sidecar.exists())
+
+    def test_one_line_last_handler(self):
+        text = (
+            b"ipcMain.handle('git:get-info', async () => {\n"
+            b'  return info()\n'
+            b'})\n'
+            b"ipcMain.handle('git:pull', gitPull)\n"
+            b'app.whenReady().then(() => {\n'
+            b'  createWindow()\n'
+            b'})\n'
+        )
+        plan = ((core.Anchor(core.GIT_GET_INFO), core.Replacement(until=core.GIT_HANDLERS)),)
+        edit_plan = core.plan_edits(plan, text)
+        self.assertEqual(edit_plan.edits, ((0, text.index(b'app.'), b''),))
+
+    def test_handler_run_must_start_with_prefix(self):
+        text = (
+            b"ipcMain.handle('git:status', async () => {\n"
+            b'  return 1\n'
+            b'})\n'
+            b"ipcMain.handle('fs:read', async () => null)\n"
+        )
+        plan = ((core.Anchor(re.compile(rb"ipcMain\.handle\('fs:")),
+                 core.Replacement(until=core.GIT_HANDLERS)),)
+        with self.assertRaises(core.PlanError):
+            core.plan_edits(plan, text)
+
+
+@unittest.skipIf(core.ahocorasick is None, 'pyahocorasick not installed')
+class SweepChunkTest(unittest.TestCase):
+
+    def test_chunked_sweep_matches_whole_sweep(self):
+        plan = tuple(
+            (core.Anchor(word), core.Replacement())
+            for word in (b'abcab', b'bca', b'cc')
+        )
+        data = b'abcabccabcacbcabcabcc' * 13
+        whole = core.sweep(plan, data)
+        default = core.SWEEP_CHUNK
+        self.addCleanup(setattr, core, 'SWEEP_CHUNK', default)
+        for chunk in (1, 2, 3, 4, 7, 64):
+            with self.subTest(chunk=chunk):
+                core.SWEEP_CHUNK = chunk
+                self.assertEqual(core.sweep(plan, data), whole)
+
+
+if __name__ == '__main__':
+    unittest.main()